@@ -12,7 +12,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from app.core.config import settings
 from app.core.database import Base
-from app.models import user, author, book
+from app.models import user, author, book, book_stats
 
 # 📄 конфіг Alembic
 config = context.config
@@ -0,0 +1,87 @@
+"""book fingerprint
+
+Revision ID: 3f9a1c7e2b54
+Revises: d6c406e4e417
+Create Date: 2026-10-19 12:40:12.418305
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7e2b54'
+down_revision: Union[str, None] = 'd6c406e4e417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+# duplicate groups shown when the migration refuses to delete them
+SHOWN_DUPLICATES = 20
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def fingerprint(title: str, author_id: int) -> str:
+    # frozen copy of app.models.book.book_fingerprint
+    return f"{author_id}:{' '.join(title.split()).casefold()}"
+
+
+def remove_duplicates(conn) -> None:
+    """Delete all but the oldest copy of every duplicate, only if the operator asked for it."""
+    duplicates = conn.execute(sa.text(
+        "SELECT fingerprint, array_agg(id ORDER BY id) AS ids FROM books "
+        "GROUP BY fingerprint HAVING count(*) > 1 ORDER BY min(id)"
+    )).all()
+    if not duplicates:
+        return
+
+    if context.get_x_argument(as_dictionary=True).get("dedupe_books") != "yes":
+        shown = "\n".join(f"  {row.fingerprint!r}: ids {row.ids}" for row in duplicates[:SHOWN_DUPLICATES])
+        more = len(duplicates) - SHOWN_DUPLICATES
+        raise RuntimeError(
+            f"{len(duplicates)} books have duplicates (same author and title):\n{shown}"
+            + (f"\n  ... and {more} more" if more > 0 else "")
+            + "\nMerge or delete them, or run `alembic -x dedupe_books=yes upgrade head`"
+            " to keep the oldest copy of each and delete the others."
+        )
+
+    # keep the oldest copy of every duplicate
+    deleted = conn.execute(sa.text(
+        "DELETE FROM books AS dup USING books AS kept "
+        "WHERE dup.fingerprint = kept.fingerprint AND dup.id > kept.id "
+        "RETURNING dup.id"
+    )).scalars().all()
+    logger.warning("Deleted %d duplicate books: ids %s", len(deleted), sorted(deleted))
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('fingerprint', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text("SELECT id, title, author_id FROM books WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            sa.text("UPDATE books SET fingerprint = :fingerprint WHERE id = :id"),
+            [{"id": row.id, "fingerprint": fingerprint(row.title, row.author_id)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    remove_duplicates(conn)
+
+    op.alter_column('books', 'fingerprint', nullable=False)
+    op.create_index(op.f('ix_books_fingerprint'), 'books', ['fingerprint'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_books_fingerprint'), table_name='books')
+    op.drop_column('books', 'fingerprint')
@@ -0,0 +1,33 @@
+"""book stats
+
+Revision ID: a84d3b6f1e29
+Revises: 3f9a1c7e2b54
+Create Date: 2026-10-19 13:41:08.551720
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a84d3b6f1e29'
+down_revision: Union[str, None] = '3f9a1c7e2b54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('book_stats',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('views', sa.BigInteger(), nullable=False),
+    sa.Column('impressions', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('book_id')
+    )
+    op.create_index(op.f('ix_book_stats_views'), 'book_stats', ['views'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_book_stats_views'), table_name='book_stats')
+    op.drop_table('book_stats')
@@ -0,0 +1,31 @@
+"""author name pattern index
+
+Revision ID: e51b7a0c9d62
+Revises: a84d3b6f1e29
+Create Date: 2026-10-19 14:22:37.104956
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e51b7a0c9d62'
+down_revision: Union[str, None] = 'a84d3b6f1e29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_authors_name_lower_pattern',
+        'authors',
+        [sa.text('lower(name) text_pattern_ops')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_authors_name_lower_pattern', table_name='authors')
@@ -0,0 +1,149 @@
+"""Admission control per route class.
+
+Requests are split into a "heavy" class (exports, full listings, imports,
+bulk deletes) and a "light" class (everything else). Each class has its own
+concurrency limit and a bounded wait queue. A request that would not get a
+slot within the class deadline (by queue length, or by the queue length
+times the average service time) is rejected right away with 503 and
+``Retry-After``. Keeping ``admission_heavy_limit`` below the database pool
+size leaves connections for light requests whatever the heavy ones do.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HEAVY_ROUTES = {
+    ("GET", "/books/export"),
+    ("GET", "/books/all"),
+    ("GET", "/books/stats"),
+    ("POST", "/books/import"),
+    ("DELETE", "/books"),
+    ("DELETE", "/authors"),
+}
+EXEMPT_PREFIXES = ("/health", "/metrics")
+
+
+class RouteClass:
+    def __init__(self, name: str, limit: int, queue_size: int, deadline: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.deadline = deadline
+        self.active = 0
+        self.waiters = deque()
+        self.admitted = 0
+        self.shed = 0
+        # moving average of the time a request holds a slot
+        self.service_time = 0.0
+
+    def estimated_wait(self) -> float:
+        return (len(self.waiters) + 1) / self.limit * self.service_time
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait()))
+
+    async def acquire(self) -> Optional[int]:
+        """Take a slot; returns the Retry-After seconds instead if the request is shed."""
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return None
+
+        if len(self.waiters) >= self.queue_size or self.estimated_wait() > self.deadline:
+            self.shed += 1
+            return self.retry_after()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=self.deadline)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            # the slot may have been handed over just before the timeout or cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            self.shed += 1
+            return self.retry_after()
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        self.admitted += 1
+        return None
+
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                # hand the slot straight to the next waiter
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def observe(self, elapsed: float):
+        self.service_time = elapsed if not self.service_time else 0.9 * self.service_time + 0.1 * elapsed
+
+
+route_classes = {
+    "heavy": RouteClass(
+        "heavy", settings.admission_heavy_limit, settings.admission_heavy_queue, settings.admission_heavy_deadline
+    ),
+    "light": RouteClass(
+        "light", settings.admission_light_limit, settings.admission_light_queue, settings.admission_light_deadline
+    ),
+}
+
+
+def classify(method: str, path: str) -> Optional[RouteClass]:
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if (method, path.rstrip("/")) in HEAVY_ROUTES:
+        return route_classes["heavy"]
+    return route_classes["light"]
+
+
+def check_pool_reserve():
+    pool = settings.db_pool_size + settings.db_max_overflow
+    if settings.admission_heavy_limit >= pool:
+        logger.warning(
+            "admission_heavy_limit (%d) leaves no database connections for light requests (pool %d)",
+            settings.admission_heavy_limit, pool,
+        )
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        check_pool_reserve()
+
+    async def __call__(self, scope, receive, send):
+        route_class = classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await route_class.acquire()
+        if retry_after is not None:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, retry later"},
+                headers={"Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release()
+            route_class.observe(time.monotonic() - start)
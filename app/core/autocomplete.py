@@ -0,0 +1,302 @@
+"""Prefix index for author name autocomplete.
+
+Every word of a case- and accent-folded author name is a key in one sorted
+list, so a prefix query is two binary searches. Matches are ranked by the
+author's book count; for prefixes of up to three characters, which match a
+large share of all authors, the best 50 are kept ranked in advance. The
+index is kept in sync by the author and book routes and reloaded every
+``autocomplete_refresh_seconds`` to pick up other workers' changes. Until
+the first load, the routes fall back to a ``lower(name) LIKE 'q%'`` query
+backed by a text_pattern_ops index.
+"""
+import asyncio
+import heapq
+import logging
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, func
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.author import Author
+from app.models.book import Book
+
+logger = logging.getLogger(__name__)
+
+
+def fold(text: str) -> str:
+    if text.isascii():
+        return " ".join(text.casefold().split())
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def name_keys(name: str) -> List[str]:
+    """The folded name starting at each of its words."""
+    words = fold(name).split(" ")
+    return [" ".join(words[start:]) for start in range(len(words))]
+
+
+class AuthorIndex:
+    # prefixes up to this length match a large share of all authors, so their
+    # top TOP_K is kept ready instead of ranking every match per query
+    SHORT_PREFIX = 3
+    TOP_K = 50
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.author_ids: List[int] = []
+        self.names: Dict[int, str] = {}
+        self.book_counts: Dict[int, int] = {}
+        # short prefix -> best TOP_K author ids in rank order; a missing entry is recomputed on demand
+        self.top: Dict[str, List[int]] = {}
+        self.loaded = False
+
+    @classmethod
+    def build(cls, authors) -> "AuthorIndex":
+        """Build from (id, name, book_count) rows."""
+        index = cls()
+        entries = []
+        keys = {}
+        for author_id, name, book_count in authors:
+            index.names[author_id] = name
+            index.book_counts[author_id] = book_count
+            keys[author_id] = name_keys(name)
+            entries.extend((key, author_id) for key in keys[author_id])
+        entries.sort()
+        index.keys = [key for key, _ in entries]
+        index.author_ids = [author_id for _, author_id in entries]
+
+        # walking all authors best first fills every top list in rank order
+        top = defaultdict(list)
+        for author_id in sorted(index.names, key=index.rank):
+            for prefix in index.short_prefixes(keys[author_id]):
+                best = top[prefix]
+                if len(best) < cls.TOP_K:
+                    best.append(author_id)
+        index.top = dict(top)
+        index.loaded = True
+        return index
+
+    def rank(self, author_id: int):
+        return -self.book_counts[author_id], self.names[author_id]
+
+    def short_prefixes(self, keys: List[str]):
+        return {key[:length] for key in keys for length in range(1, self.SHORT_PREFIX + 1)}
+
+    def _promote(self, author_id: int):
+        """The author's rank went up: it can only enter the cached top lists."""
+        for prefix in self.short_prefixes(name_keys(self.names[author_id])):
+            top = self.top.get(prefix)
+            if top is None:
+                continue
+            if author_id not in top:
+                top.append(author_id)
+            top.sort(key=self.rank)
+            del top[self.TOP_K:]
+
+    def _demote(self, author_id: int, name: str):
+        """The author's rank went down or it is gone: a full list may now miss its successor."""
+        for prefix in self.short_prefixes(name_keys(name)):
+            top = self.top.get(prefix)
+            if top is None or author_id not in top:
+                continue
+            if len(top) == self.TOP_K:
+                del self.top[prefix]
+            else:
+                top.remove(author_id)
+                if author_id in self.names:
+                    top.append(author_id)
+                    top.sort(key=self.rank)
+
+    def add(self, author_id: int, name: str):
+        if author_id in self.names:
+            self.rename(author_id, name)
+            return
+        self.names[author_id] = name
+        self.book_counts.setdefault(author_id, 0)
+        for key in name_keys(name):
+            position = bisect_left(self.keys, key)
+            self.keys.insert(position, key)
+            self.author_ids.insert(position, author_id)
+        self._promote(author_id)
+
+    def remove(self, author_id: int):
+        name = self.names.pop(author_id, None)
+        self.book_counts.pop(author_id, None)
+        if name is None:
+            return
+        self._demote(author_id, name)
+        for key in name_keys(name):
+            position = bisect_left(self.keys, key)
+            while position < len(self.keys) and self.keys[position] == key:
+                if self.author_ids[position] == author_id:
+                    del self.keys[position]
+                    del self.author_ids[position]
+                    break
+                position += 1
+
+    def rename(self, author_id: int, name: str):
+        book_count = self.book_counts.get(author_id, 0)
+        self.remove(author_id)
+        self.add(author_id, name)
+        self.set_book_count(author_id, book_count)
+
+    def set_book_count(self, author_id: int, book_count: int):
+        previous = self.book_counts.get(author_id)
+        if previous is None or previous == book_count:
+            return
+        self.book_counts[author_id] = book_count
+        if book_count > previous:
+            self._promote(author_id)
+        else:
+            self._demote(author_id, self.names[author_id])
+
+    def count_books(self, author_id: int, delta: int):
+        if author_id in self.book_counts:
+            self.set_book_count(author_id, max(self.book_counts[author_id] + delta, 0))
+
+    def _scan(self, prefix: str, limit: int) -> List[int]:
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+        return heapq.nsmallest(limit, set(self.author_ids[start:end]), key=self.rank)
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        prefix = fold(query)
+        if not prefix:
+            return []
+        if len(prefix) <= self.SHORT_PREFIX and limit <= self.TOP_K:
+            best = self.top.get(prefix)
+            if best is None:
+                best = self.top[prefix] = self._scan(prefix, self.TOP_K)
+            best = best[:limit]
+        else:
+            best = self._scan(prefix, limit)
+        return [
+            {"id": author_id, "name": self.names[author_id], "book_count": self.book_counts[author_id]}
+            for author_id in best
+        ]
+
+
+def book_counts_query():
+    return (
+        select(Author.id, Author.name, func.count(Book.id).label("book_count"))
+        .outerjoin(Book, Book.author_id == Author.id)
+        .group_by(Author.id)
+    )
+
+
+async def search_database(session, query: str, limit: int) -> List[dict]:
+    """Cold-start fallback: plain prefix match on the lower-cased full name."""
+    prefix = query.strip().lower()
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    result = await session.execute(
+        book_counts_query()
+        .where(func.lower(Author.name).like(f"{escaped}%", escape="\\"))
+        .order_by(func.count(Book.id).desc(), Author.name)
+        .limit(limit)
+    )
+    return [dict(row) for row in result.mappings()]
+
+
+# recount queries per reload before giving up on a busy catalog
+RECOUNT_ROUNDS = 5
+
+
+class AuthorAutocomplete:
+    def __init__(self):
+        self.index: Optional[AuthorIndex] = None
+        # changes seen while a reload is running, applied to the new index
+        self.journal: Optional[List[tuple]] = None
+        self._reload = asyncio.Event()
+
+    def _record(self, method: str, *args):
+        if self.journal is not None:
+            self.journal.append((method, args))
+        if self.index is not None:
+            getattr(self.index, method)(*args)
+
+    def add(self, author_id: int, name: str):
+        self._record("add", author_id, name)
+
+    def rename(self, author_id: int, name: str):
+        self._record("rename", author_id, name)
+
+    def remove(self, author_id: int):
+        self._record("remove", author_id)
+
+    def count_books(self, author_id: int, delta: int):
+        self._record("count_books", author_id, delta)
+
+    def invalidate(self):
+        """Reload soon, for bulk changes of book counts."""
+        self._reload.set()
+
+    async def reload(self):
+        self.journal = []
+        try:
+            async with async_session_maker() as session:
+                result = await session.execute(book_counts_query())
+                rows = result.all()
+            index = await asyncio.to_thread(AuthorIndex.build, rows)
+
+            # a count delta may or may not be included in the rows above, so
+            # instead of replaying it the author's count is read again, until
+            # no new delta arrived while the recount query ran
+            counts = {}
+            seen = 0
+            for _ in range(RECOUNT_ROUNDS):
+                recounted = {args[0] for method, args in self.journal[seen:] if method == "count_books"}
+                seen = len(self.journal)
+                if not recounted:
+                    break
+                async with async_session_maker() as session:
+                    result = await session.execute(book_counts_query().where(Author.id.in_(recounted)))
+                    counts.update((author_id, book_count) for author_id, _, book_count in result.all())
+            else:
+                # books keep changing, the next reload picks up what was missed
+                self._reload.set()
+
+            for method, args in self.journal:
+                if method != "count_books":
+                    getattr(index, method)(*args)
+            for author_id, book_count in counts.items():
+                index.set_book_count(author_id, book_count)
+        finally:
+            self.journal = None
+        self.index = index
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._reload.wait(), timeout=settings.autocomplete_refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._reload.clear()
+            try:
+                await self.reload()
+            except Exception:
+                logger.warning("Could not reload the author index", exc_info=True)
+
+
+autocomplete = AuthorAutocomplete()
+_tasks: List[asyncio.Task] = []
+
+
+async def start():
+    try:
+        await autocomplete.reload()
+    except Exception:
+        logger.warning("Could not load the author index", exc_info=True)
+    _tasks.append(asyncio.create_task(autocomplete.run()))
+
+
+async def stop():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
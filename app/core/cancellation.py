@@ -0,0 +1,78 @@
+"""Per-route statement timeouts and cancellation of abandoned requests.
+
+``StatementTimeoutMiddleware`` picks the statement timeout of the request
+path, which ``app.core.database`` applies with ``SET LOCAL`` at the start of
+every transaction. ``CancelOnDisconnectMiddleware`` watches GET requests for
+the client going away and cancels the handler, including streaming
+responses. The in-flight asyncpg query is then cancelled and its connection
+goes back to the pool.
+"""
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import statement_timeout
+
+logger = logging.getLogger(__name__)
+
+
+class StatementTimeoutMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"].rstrip("/") or "/"
+        token = statement_timeout.set(settings.statement_timeouts.get(path, settings.statement_timeout_ms))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            statement_timeout.reset(token)
+
+
+class CancelOnDisconnectMiddleware:
+    # writes are left to finish, a half-done import is worse than a wasted one
+    methods = ("GET", "HEAD")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+
+        # the watcher is the only reader of receive() and forwards every message to the app
+        messages = asyncio.Queue()
+        state = {"response_complete": False, "disconnected": False}
+
+        async def send_tracking(message):
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                state["response_complete"] = True
+            await send(message)
+
+        handler = asyncio.create_task(self.app(scope, messages.get, send_tracking))
+
+        async def watch():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    if not state["response_complete"]:
+                        state["disconnected"] = True
+                        handler.cancel()
+                    return
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not state["disconnected"]:
+                handler.cancel()
+                raise
+            logger.info("Client disconnected, cancelled %s %s", scope["method"], scope["path"])
+        finally:
+            watcher.cancel()
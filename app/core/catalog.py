@@ -0,0 +1,152 @@
+"""Optional in-memory read engine for GET /books/.
+
+When ``catalog_snapshot`` is enabled every worker keeps an
+``app.core.snapshot.Snapshot`` of the catalog. Mutations made by the worker
+are applied to it right away. Changes made by other workers show up with the
+periodic reload every ``snapshot_refresh_seconds``. Listing falls back to
+Postgres while there is no snapshot yet, after bulk changes invalidated it,
+or when it is older than ``snapshot_max_age_seconds``.
+
+NumPy is only imported when the engine is enabled.
+"""
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app.core import columnar
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.author import Author
+from app.models.book import Book
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = ("id", "title", "genre", "published_year", "author_id")
+
+
+async def load_snapshot():
+    from app.core.snapshot import Snapshot
+
+    query = columnar.books_query(SNAPSHOT_FIELDS).order_by(Book.id)
+    batches = [batch async for batch in columnar.record_batches(SNAPSHOT_FIELDS, query)]
+    async with async_session_maker() as session:
+        result = await session.execute(select(Author.id, Author.name))
+        author_names = dict(result.all())
+        # the database collation decides the title order, NumPy cannot reproduce it
+        result = await session.execute(select(Book.id).order_by(Book.title, Book.id))
+        title_order = result.scalars().all()
+
+    return await asyncio.to_thread(Snapshot.from_batches, batches, author_names, title_order)
+
+
+class CatalogEngine:
+    def __init__(self):
+        self.snapshot = None
+        self.stale = True
+        # bumped by invalidate() so a reload that started earlier stays stale
+        self.generation = 0
+        # mutations seen while a reload is running, replayed onto the new snapshot
+        self.journal: Optional[List[tuple]] = None
+        self._reload = asyncio.Event()
+        self._reindex = asyncio.Event()
+
+    def fresh(self):
+        snapshot = self.snapshot
+        if snapshot is None or self.stale:
+            return None
+        if time.monotonic() - snapshot.loaded_at > settings.snapshot_max_age_seconds:
+            return None
+        return snapshot
+
+    def _apply(self, snapshot, change: tuple):
+        action, argument = change
+        if action == "upsert":
+            if not snapshot.upsert(argument):
+                self.invalidate()
+        elif action == "delete":
+            snapshot.delete(argument)
+        else:
+            snapshot.rename_author(*argument)
+
+    def _record(self, change: tuple):
+        if self.journal is not None:
+            self.journal.append(change)
+        if self.snapshot is not None:
+            self._apply(self.snapshot, change)
+            self._reindex.set()
+
+    def upsert(self, book: dict):
+        self._record(("upsert", book))
+
+    def delete(self, book_id: int):
+        self._record(("delete", book_id))
+
+    def rename_author(self, author_id: int, name: str):
+        self._record(("rename_author", (author_id, name)))
+
+    def invalidate(self):
+        """Stop serving the snapshot until the next reload, for bulk changes."""
+        self.stale = True
+        self.generation += 1
+        self._reload.set()
+
+    async def reload(self):
+        generation = self.generation
+        self.journal = []
+        try:
+            snapshot = await load_snapshot()
+            for change in self.journal:
+                self._apply(snapshot, change)
+        finally:
+            self.journal = None
+        self.snapshot = snapshot
+        if self.generation == generation:
+            self.stale = False
+
+    async def run_reloads(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._reload.wait(), timeout=settings.snapshot_refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._reload.clear()
+            try:
+                await self.reload()
+            except Exception:
+                logger.warning("Could not reload the catalog snapshot", exc_info=True)
+
+    async def run_reindex(self):
+        while True:
+            await self._reindex.wait()
+            # let a burst of mutations settle before rebuilding
+            await asyncio.sleep(1)
+            self._reindex.clear()
+            snapshot = self.snapshot
+            if snapshot is not None and snapshot.search_version != snapshot.title_version:
+                indexes = await asyncio.to_thread(snapshot.build_indexes)
+                snapshot.install_indexes(*indexes)
+
+
+catalog = CatalogEngine()
+_tasks: List[asyncio.Task] = []
+
+
+async def start():
+    if not settings.catalog_snapshot:
+        return
+    try:
+        await catalog.reload()
+    except Exception:
+        logger.warning("Could not load the catalog snapshot", exc_info=True)
+    _tasks.append(asyncio.create_task(catalog.run_reloads()))
+    _tasks.append(asyncio.create_task(catalog.run_reindex()))
+
+
+async def stop():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -1,3 +1,5 @@
+from typing import Dict, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,6 +12,58 @@ class Settings(BaseSettings):
     log_level: str = "info"
     environment: str = "development"
 
+    bulk_delete_chunk_size: int = 1000
+    export_batch_size: int = 10000
+    import_batch_size: int = 1000
+
+    counter_flush_seconds: float = 5
+    counter_flush_events: int = 1000
+    popularity_refresh_seconds: float = 60
+    popularity_top_n: int = 100
+
+    # in-memory read engine for GET /books/, see app/core/catalog.py
+    catalog_snapshot: bool = False
+    snapshot_refresh_seconds: float = 60
+    snapshot_max_age_seconds: float = 120
+
+    autocomplete_refresh_seconds: float = 300
+
+    # concurrency limit, wait queue length and deadline (seconds) per route class, see app/core/admission.py
+    admission_heavy_limit: int = 4
+    admission_heavy_queue: int = 16
+    admission_heavy_deadline: float = 10
+    admission_light_limit: int = 64
+    admission_light_queue: int = 256
+    admission_light_deadline: float = 2
+
+    # "alembic" only checks the head revision, "create_all" creates missing tables, "off" skips the check
+    schema_check: str = "alembic"
+    schema_check_cache_seconds: int = 300
+
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_warmup: int = 2
+
+    # SET LOCAL statement_timeout (ms) per request path, statement_timeout_ms elsewhere; 0 disables it
+    statement_timeout_ms: int = 0
+    statement_timeouts: Dict[str, int] = {
+        "/books/export": 120000,
+        "/books/stats": 60000,
+        "/books/all": 30000,
+        "/books/recommend": 5000,
+    }
+
+    # python -m app.serve
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    web_concurrency: Optional[int] = None  # defaults to the number of available cores
+    server_keepalive: int = 5
+    server_backlog: int = 2048
+    server_limit_concurrency: Optional[int] = None
+    server_timeout: int = 60
+    server_max_requests: int = 10000
+    server_max_requests_jitter: int = 1000
+
     class Config:
         env_file = ".env"
 
@@ -1,5 +1,7 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declarative_base, Session
+from sqlalchemy import event
+from contextvars import ContextVar
 from typing import AsyncGenerator
 from fastapi import Depends
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
@@ -10,12 +12,30 @@ Base = declarative_base()
 
 engine = create_async_engine(
     settings.database_url,
-    echo=True
+    echo=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
 )
 
+# statement timeout (ms) for transactions started in the current request, 0 for none
+statement_timeout: ContextVar[int] = ContextVar("statement_timeout", default=settings.statement_timeout_ms)
+
+
+class TimeoutSession(Session):
+    pass
+
+
+@event.listens_for(TimeoutSession, "after_begin")
+def set_statement_timeout(session, transaction, connection):
+    timeout = statement_timeout.get()
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
 async_session_maker = async_sessionmaker(
     bind=engine,
-    expire_on_commit=False
+    expire_on_commit=False,
+    sync_session_class=TimeoutSession
 )
 
 async def get_db_and_tables():
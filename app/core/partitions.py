@@ -0,0 +1,102 @@
+"""Optional partitioning of the ``books`` table.
+
+``scripts/partition_books.py`` converts the table, either range-partitioned by
+``published_year`` or list-partitioned by ``genre``, with a DEFAULT partition
+catching anything else. On startup every worker reads the actual layout from
+``pg_partitioned_table``, so the application never has to be told about it, and
+creates the partitions for the current and the next year range.
+
+Postgres requires unique indexes of a partitioned table to contain the
+partition key, so the fingerprint index becomes (fingerprint, key) and
+duplicate detection only works within one partition.
+"""
+import datetime
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.models.book import Book, Genre
+
+logger = logging.getLogger(__name__)
+
+FIRST_YEAR = 1800
+DEFAULT_SPAN = 10
+
+# column books is partitioned by, read from the database by ensure_partitions()
+partitioned_by: Optional[str] = None
+
+
+def partition_key():
+    """Column that has to be part of every unique index on books, if partitioned."""
+    if partitioned_by:
+        return getattr(Book, partitioned_by)
+    return None
+
+
+async def read_partitioning(conn) -> Optional[str]:
+    result = await conn.execute(text(
+        "SELECT a.attname FROM pg_partitioned_table p "
+        "JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0] "
+        "WHERE p.partrelid = to_regclass('books')"
+    ))
+    return result.scalar()
+
+
+def year_span(partitions) -> int:
+    """Width of the year ranges, taken from the existing ``books_y<start>`` partitions."""
+    starts = sorted(int(m.group(1)) for name in partitions if (m := re.fullmatch(r"books_y(\d+)", name)))
+    spans = [b - a for a, b in zip(starts, starts[1:])]
+    return min(spans) if spans else DEFAULT_SPAN
+
+
+def year_partition(year: int, span: int) -> str:
+    start = year - year % span
+    return (
+        f"CREATE TABLE IF NOT EXISTS books_y{start} PARTITION OF books "
+        f"FOR VALUES FROM ({start}) TO ({start + span})"
+    )
+
+
+def genre_partition(genre: Genre) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS books_{genre.name} PARTITION OF books "
+        f"FOR VALUES IN ('{genre.name}')"
+    )
+
+
+def partition_ddl(partition_by: str, span: int, until_year: int) -> list:
+    """Statements creating the partitions for every known year range or genre."""
+    if partition_by == "published_year":
+        statements = [year_partition(year, span) for year in range(FIRST_YEAR, until_year + 1, span)]
+    else:
+        statements = [genre_partition(genre) for genre in Genre]
+    statements.append("CREATE TABLE IF NOT EXISTS books_default PARTITION OF books DEFAULT")
+    return statements
+
+
+async def ensure_partitions(conn):
+    """Read how books is partitioned and create partitions for new year ranges (or genres)."""
+    global partitioned_by
+    partitioned_by = await read_partitioning(conn)
+    if not partitioned_by:
+        return
+
+    result = await conn.execute(
+        text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'books'::regclass")
+    )
+    existing = set(result.scalars().all())
+
+    span = year_span(existing)
+    statements = partition_ddl(partitioned_by, span, datetime.date.today().year + span)
+    for statement in statements:
+        name = statement.split()[5]
+        if name in existing:
+            continue
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text(statement))
+        except Exception:
+            # rows of this range already sit in the default partition
+            logger.warning("Could not create partition %s", name, exc_info=True)
@@ -0,0 +1,174 @@
+"""Book view counters and popularity ranking.
+
+Views and recommendation impressions are counted in memory per worker and
+written behind to ``book_stats`` in one batched upsert every
+``counter_flush_seconds`` or after ``counter_flush_events`` events; whatever
+is left is drained on shutdown. The most viewed books, overall and per genre,
+are cached in memory and refreshed every ``popularity_refresh_seconds``.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.author import Author
+from app.models.book import Book, Genre
+from app.models.book_stats import BookStats
+
+logger = logging.getLogger(__name__)
+
+
+class BookCounters:
+    def __init__(self):
+        self.views: Dict[int, int] = defaultdict(int)
+        self.impressions: Dict[int, int] = defaultdict(int)
+        self.events = 0
+        self.stopping = False
+        self._wake = asyncio.Event()
+
+    def view(self, book_id: int):
+        self.views[book_id] += 1
+        self._count(1)
+
+    def impression(self, book_ids: List[int]):
+        for book_id in book_ids:
+            self.impressions[book_id] += 1
+        self._count(len(book_ids))
+
+    def _count(self, events: int):
+        self.events += events
+        if self.events >= settings.counter_flush_events:
+            self._wake.set()
+
+    async def flush(self):
+        if not self.events:
+            return
+        views, impressions = self.views, self.impressions
+        self.views, self.impressions = defaultdict(int), defaultdict(int)
+        self.events = 0
+
+        # sorted keys keep concurrent upserts from different workers deadlock-free
+        rows = [
+            {"book_id": book_id, "views": views.get(book_id, 0), "impressions": impressions.get(book_id, 0)}
+            for book_id in sorted(views.keys() | impressions.keys())
+        ]
+        stmt = insert(BookStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BookStats.book_id],
+            set_={
+                "views": BookStats.views + stmt.excluded.views,
+                "impressions": BookStats.impressions + stmt.excluded.impressions,
+            },
+        )
+        try:
+            async with async_session_maker() as session:
+                await session.execute(stmt, rows)
+                await session.commit()
+        except Exception:
+            logger.warning("Could not flush %d book counters, keeping them", len(rows), exc_info=True)
+            for row in rows:
+                self.views[row["book_id"]] += row["views"]
+                self.impressions[row["book_id"]] += row["impressions"]
+                self.events += row["views"] + row["impressions"]
+
+    async def run(self):
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.counter_flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def stop(self, task: asyncio.Task):
+        # let a running flush finish instead of cancelling it, then drain the rest
+        self.stopping = True
+        self._wake.set()
+        await task
+        await self.flush()
+
+
+class PopularBooks:
+    def __init__(self):
+        self.top: Dict[Optional[Genre], List[dict]] = {}
+        self.scores: Dict[int, int] = {}
+
+    def books(self, genre: Optional[Genre] = None, limit: int = 10) -> List[dict]:
+        return self.top.get(genre, [])[:limit]
+
+    def score(self, book_id: int) -> int:
+        return self.scores.get(book_id, 0)
+
+    async def refresh(self):
+        rank = func.row_number().over(partition_by=Book.genre, order_by=BookStats.views.desc()).label("rank")
+        ranked = (
+            select(
+                Book.id,
+                Book.title,
+                Book.genre,
+                Book.published_year,
+                Book.author_id,
+                Author.name.label("author_name"),
+                BookStats.views,
+                rank,
+            )
+            .join(BookStats, BookStats.book_id == Book.id)
+            .join(Author, Author.id == Book.author_id)
+            .subquery()
+        )
+        # the overall top N is contained in the union of the per-genre top N
+        query = (
+            select(ranked)
+            .where(ranked.c.rank <= settings.popularity_top_n)
+            .order_by(ranked.c.views.desc())
+        )
+        async with async_session_maker() as session:
+            result = await session.execute(query)
+            rows = result.mappings().all()
+
+        top = defaultdict(list)
+        for row in rows:
+            book = {field: row[field] for field in ("id", "title", "genre", "published_year", "author_id", "author_name")}
+            top[row["genre"]].append(book)
+            if len(top[None]) < settings.popularity_top_n:
+                top[None].append(book)
+
+        self.top = dict(top)
+        self.scores = {row["id"]: row["views"] for row in rows}
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(settings.popularity_refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.warning("Could not refresh popular books", exc_info=True)
+
+
+counters = BookCounters()
+popular = PopularBooks()
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def start():
+    try:
+        await popular.refresh()
+    except Exception:
+        logger.warning("Could not load popular books", exc_info=True)
+    counters.stopping = False
+    _tasks["counters"] = asyncio.create_task(counters.run())
+    _tasks["popular"] = asyncio.create_task(popular.run())
+
+
+async def stop():
+    if not _tasks:
+        return
+    _tasks["popular"].cancel()
+    await asyncio.gather(_tasks["popular"], return_exceptions=True)
+    await counters.stop(_tasks["counters"])
+    _tasks.clear()
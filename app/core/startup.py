@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from app.core.config import settings
+from app.core.database import engine, get_db_and_tables
+from app.core.partitions import ensure_partitions
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class StartupState:
+    ready: bool = False
+
+
+state = StartupState()
+
+# coroutines run once per worker after the schema check, e.g. to fill in-memory caches
+warmup_hooks = []
+
+
+def alembic_head() -> str:
+    # alembic is only needed at startup, keep it out of the import path of the app
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory.from_config(Config(str(ALEMBIC_INI)))
+    return script.get_current_head()
+
+
+def _marker_path(head: str) -> Path:
+    db_hash = hashlib.sha1(settings.database_url.encode()).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"book-manager-schema-{db_hash}-{head}"
+
+
+async def check_schema_head():
+    """Make sure the database is migrated to the alembic head.
+
+    The result is cached in a marker file, so workers started together on the
+    same host run the query only once.
+    """
+    head = alembic_head()
+    marker = _marker_path(head)
+    try:
+        if time.time() - marker.stat().st_mtime < settings.schema_check_cache_seconds:
+            return
+    except FileNotFoundError:
+        pass
+
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        current = result.scalar()
+
+    if current != head:
+        raise RuntimeError(
+            f"Database is at revision {current}, expected {head}. Run `alembic upgrade head`."
+        )
+    marker.touch()
+
+
+async def warm_pool(connections: int):
+    async def checkout():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(checkout() for _ in range(connections)))
+
+
+async def startup():
+    if settings.schema_check == "create_all":
+        await get_db_and_tables()
+    elif settings.schema_check == "alembic":
+        await check_schema_head()
+
+    async with engine.begin() as conn:
+        await ensure_partitions(conn)
+
+    configure_mappers()
+    await warm_pool(min(settings.db_pool_warmup, settings.db_pool_size))
+    for hook in warmup_hooks:
+        await hook()
+
+    state.ready = True
+
+
+async def shutdown():
+    state.ready = False
+    await engine.dispose()
@@ -6,17 +6,29 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+from sqlalchemy.exc import DBAPIError
 
-from app.core.database import get_db_and_tables
-from app.routes import book, author, user
+from app.core.startup import startup, shutdown, warmup_hooks
+from app.core import popularity, catalog, autocomplete
+from app.core.admission import AdmissionMiddleware
+from app.core.cancellation import StatementTimeoutMiddleware, CancelOnDisconnectMiddleware
+from app.routes import book, author, user, health, metrics
 from app.routes.auth import fastapi_users, auth_backend
 from app.schemas.user import UserRead, UserCreate, UserUpdate
 
 
+# filled before the worker reports ready
+warmup_hooks.extend([popularity.start, catalog.start, autocomplete.start])
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await get_db_and_tables()
+    await startup()
     yield
+    await autocomplete.stop()
+    await catalog.stop()
+    await popularity.stop()
+    await shutdown()
 
 app = FastAPI(
     title="Book Management System",
@@ -31,6 +43,19 @@ app.add_middleware(SlowAPIMiddleware)
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
     return JSONResponse(status_code=429, content={"detail": "Too Many Requests"})
 
+@app.exception_handler(DBAPIError)
+async def statement_timeout_handler(request: Request, exc: DBAPIError):
+    # 57014 query_canceled: the statement_timeout of the route was hit
+    if getattr(exc.orig, "sqlstate", None) == "57014":
+        return JSONResponse(status_code=504, content={"detail": "Query took too long"})
+    raise exc
+
+app.add_middleware(CancelOnDisconnectMiddleware)
+app.add_middleware(StatementTimeoutMiddleware)
+
+# inside CORS so that 503s from load shedding still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -60,3 +85,5 @@ app.include_router(
 app.include_router(book.router)
 app.include_router(author.router)
 app.include_router(user.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer,DateTime, String, ForeignKey, func, Enum, Boolean
+from sqlalchemy import Column, Integer,DateTime, String, ForeignKey, func, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -13,4 +13,9 @@ class Author(Base):
     name = Column(String, nullable=False, unique=True)
     
 
-    books = relationship("Book", back_populates="author", cascade="all, delete")
\ No newline at end of file
+    books = relationship("Book", back_populates="author", cascade="all, delete", passive_deletes=True)
+
+    __table_args__ = (
+        # prefix search fallback of /authors/autocomplete
+        Index("ix_authors_name_lower_pattern", func.lower(name).label("lower_name"), postgresql_ops={"lower_name": "text_pattern_ops"}),
+    )
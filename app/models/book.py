@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean, event
 from sqlalchemy.orm import relationship
 import enum
 
@@ -11,6 +11,12 @@ class Genre(str, enum.Enum):
     science = "Science"
     history = "History"
 
+
+def book_fingerprint(title: str, author_id: int) -> str:
+    """Duplicate key of a book: case-folded, whitespace-collapsed title of one author."""
+    return f"{author_id}:{' '.join(title.split()).casefold()}"
+
+
 class Book(Base):
     __tablename__ = "books"
     
@@ -18,6 +24,13 @@ class Book(Base):
     title = Column(String, nullable=False)
     published_year = Column(Integer, nullable=False)
     genre = Column(Enum(Genre), nullable=False)
+    fingerprint = Column(String, nullable=False, unique=True, index=True)
 
     author_id = Column(Integer, ForeignKey("authors.id", ondelete="CASCADE"), nullable=False)
     author = relationship("Author", back_populates="books")
+
+
+@event.listens_for(Book, "before_insert")
+@event.listens_for(Book, "before_update")
+def set_fingerprint(mapper, connection, book):
+    book.fingerprint = book_fingerprint(book.title, book.author_id)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, BigInteger
+
+from app.core.database import Base
+
+
+class BookStats(Base):
+    __tablename__ = "book_stats"
+
+    # no foreign key: books may be partitioned, stale rows are ignored by the joins
+    book_id = Column(Integer, primary_key=True)
+    views = Column(BigInteger, nullable=False, default=0, index=True)
+    impressions = Column(BigInteger, nullable=False, default=0)
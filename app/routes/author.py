@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete
 from typing import List
 from app.models.author import Author
-from app.schemas.author import AuthorCreate, AuthorOut
+from app.models.book import Book
+from app.core.config import settings
+from app.core.catalog import catalog
+from app.core.autocomplete import autocomplete, search_database
+from app.schemas.author import AuthorCreate, AuthorOut, AuthorMatch
 from app.core.database import get_async_session
 from app.routes.auth import current_active_user
+from app.routes.book import delete_books_in_chunks
 
 router = APIRouter(prefix="/authors", tags=["authors"])
 
@@ -15,6 +20,17 @@ async def get_authors(session: AsyncSession = Depends(get_async_session)):
     result = await session.execute(select(Author))
     return result.scalars().all()
 
+# GET /authors/autocomplete?q= — top matches by name prefix, ranked by book count
+@router.get("/autocomplete", response_model=List[AuthorMatch])
+async def autocomplete_authors(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if autocomplete.index is not None:
+        return autocomplete.index.search(q, limit)
+    return await search_database(session, q, limit)
+
 # GET /authors/{author_id}
 @router.get("/{author_id}", response_model=AuthorOut)
 async def get_author(author_id: int, session: AsyncSession = Depends(get_async_session)):
@@ -38,6 +54,7 @@ async def create_author(
     session.add(author)
     await session.commit()
     await session.refresh(author)
+    autocomplete.add(author.id, author.name)
     return author
 
 # PUT /authors/{author_id}
@@ -55,6 +72,8 @@ async def update_author(
     author.name = data.name
     await session.commit()
     await session.refresh(author)
+    catalog.rename_author(author_id, author.name)
+    autocomplete.rename(author_id, author.name)
     return author
 
 # DELETE /authors/{author_id}
@@ -64,10 +83,38 @@ async def delete_author(
     session: AsyncSession = Depends(get_async_session),
     user=Depends(current_active_user)
 ):
-    author = await session.get(Author, author_id)
-    if not author:
+    # books are removed by the ON DELETE CASCADE foreign key, not loaded into the session
+    result = await session.execute(delete(Author).where(Author.id == author_id))
+    if not result.rowcount:
         raise HTTPException(status_code=404, detail="Author not found")
 
-    await session.delete(author)
     await session.commit()
+    catalog.invalidate()
+    autocomplete.remove(author_id)
     return {"detail": f"Author {author_id} deleted successfully"}
+
+# DELETE /authors/?ids=1&ids=2 — bulk delete in chunks
+@router.delete("/")
+async def delete_authors(
+    ids: List[int] = Query(...),
+    session: AsyncSession = Depends(get_async_session),
+    user=Depends(current_active_user)
+):
+    ids = sorted(set(ids))
+    chunk_size = settings.bulk_delete_chunk_size
+
+    deleted_authors = 0
+    deleted_books = 0
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        # books go first in bounded chunks, the cascade then only catches books added meanwhile
+        deleted_books += await delete_books_in_chunks(session, Book.author_id.in_(chunk))
+        result = await session.execute(delete(Author).where(Author.id.in_(chunk)))
+        await session.commit()
+        deleted_authors += result.rowcount
+        for author_id in chunk:
+            autocomplete.remove(author_id)
+
+    if deleted_books:
+        catalog.invalidate()
+    return {"deleted_authors": deleted_authors, "deleted_books": deleted_books}
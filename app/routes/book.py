@@ -1,24 +1,83 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, any_, bindparam, String
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from typing import List, Optional
-import csv, io, json, random
+import csv, heapq, io, json, random
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 
 from app.routes.auth import current_active_user
+from app.core.config import settings
 from app.core.database import get_async_session
-from app.models.book import Book, Genre
+from app.core import columnar
+from app.core.partitions import partition_key
+from app.core.popularity import counters, popular
+from app.core.catalog import catalog
+from app.core.autocomplete import autocomplete
+from app.models.book import Book, Genre, book_fingerprint
 from app.models.author import Author
 from app.models.user import User
-from app.schemas.book import BookCreate, BookUpdate, BookOut
+from app.schemas.book import BookCreate, BookUpdate, BookOut, BOOK_FIELDS, book_serializer
 
 limiter = Limiter(key_func=get_remote_address)
 router = APIRouter(prefix="/books", tags=["books"])
 
+
+def book_fields(
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(BOOK_FIELDS)}"),
+) -> tuple:
+    """Parse the sparse fieldset, keeping the canonical field order so serializers are shared."""
+    if not fields:
+        return BOOK_FIELDS
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    if not requested:
+        raise HTTPException(status_code=422, detail="fields must name at least one field")
+    unknown = requested - set(BOOK_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in BOOK_FIELDS if field in requested)
+
+
+def insert_books(on_duplicate: str):
+    """INSERT into books resolving fingerprint conflicts by the skip/update/error policy."""
+    stmt = insert(Book)
+    index_elements = [Book.fingerprint]
+    key = partition_key()
+    if key is not None:
+        index_elements.append(key)
+
+    if on_duplicate == "update":
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={
+                "title": stmt.excluded.title,
+                "published_year": stmt.excluded.published_year,
+                "genre": stmt.excluded.genre,
+            },
+        )
+    # "error" is reported by the caller when no row comes back
+    return stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+async def delete_books_in_chunks(session: AsyncSession, *filters) -> int:
+    """Delete matching books bulk_delete_chunk_size rows per statement, committing each chunk."""
+    chunk_size = settings.bulk_delete_chunk_size
+    chunk = select(Book.id).where(*filters).limit(chunk_size).scalar_subquery()
+
+    deleted = 0
+    while True:
+        result = await session.execute(delete(Book).where(Book.id.in_(chunk)))
+        # commit every chunk so locks are held only for one batch
+        await session.commit()
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            return deleted
+
 # GET /books/recommend
 @router.get("/recommend", response_model=List[BookOut])
 @limiter.limit("5/minute")
@@ -51,7 +110,9 @@ async def recommend_books(
     if not books:
         return []
 
-    sample = random.sample(books, min(5, len(books)))
+    # weighted sample without replacement (Efraimidis-Spirakis): popular books come up more often
+    sample = heapq.nlargest(5, books, key=lambda b: random.random() ** (1 / (1 + popular.score(b.id))))
+    counters.impression([b.id for b in sample])
     return [
         BookOut(
             id=b.id,
@@ -63,53 +124,54 @@ async def recommend_books(
         ) for b in sample
     ]
 
+# GET /books/popular — most viewed books, served from the in-memory top-N cache
+@router.get("/popular", response_model=List[BookOut])
+async def popular_books(
+    genre: Optional[Genre] = None,
+    limit: int = Query(10, ge=1, le=settings.popularity_top_n),
+):
+    return popular.books(genre, limit)
+
 # GET /books/export
 @router.get("/export")
 async def export_books(
-    format: str = Query("json", regex="^(json|csv)$"),
+    format: str = Query("json", regex="^(json|csv|parquet|arrow)$"),
+    fields: tuple = Depends(book_fields),
     session: AsyncSession = Depends(get_async_session)
 ):
-    result = await session.execute(
-        select(Book).options(joinedload(Book.author))
-    )
-    books = result.scalars().all()
+    if format in columnar.MEDIA_TYPES:
+        return StreamingResponse(
+            columnar.stream_export(format, fields),
+            media_type=columnar.MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
+        )
 
-    data = [
-        {
-            "id": b.id,
-            "title": b.title,
-            "genre": b.genre,
-            "published_year": b.published_year,
-            "author_id": b.author_id,
-            "author_name": b.author.name
-        }
-        for b in books
-    ]
+    result = await session.execute(columnar.books_query(fields))
+    data = [row._asdict() for row in result]
 
     if format == "json":
-        return data
+        return Response(book_serializer(fields, many=True).dump_json(data), media_type="application/json")
     else:
         output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=data[0].keys())
+        writer = csv.DictWriter(output, fieldnames=fields)
         writer.writeheader()
         writer.writerows(data)
         return output.getvalue()
 
+# GET /books/stats — book counts by genre, decade or author
+@router.get("/stats")
+async def book_stats(by: str = Query("genre", regex="^(genre|decade|author)$")):
+    return await columnar.book_counts(by)
+
 # GET /books/all — get all books without filters
 @router.get("/all", response_model=List[BookOut])
-async def get_all_books(session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Book).options(joinedload(Book.author)))
-    books = result.scalars().all()
-    return [
-        BookOut(
-            id=b.id,
-            title=b.title,
-            genre=b.genre,
-            published_year=b.published_year,
-            author_id=b.author_id,
-            author_name=b.author.name
-        ) for b in books
-    ]
+async def get_all_books(
+    fields: tuple = Depends(book_fields),
+    session: AsyncSession = Depends(get_async_session),
+):
+    result = await session.execute(columnar.books_query(fields))
+    data = [row._asdict() for row in result]
+    return Response(book_serializer(fields, many=True).dump_json(data), media_type="application/json")
 
 
 # GET /books/ (with filters, pagination, sorting)
@@ -125,9 +187,16 @@ async def get_books(
     sort_by: Optional[str] = Query(None, regex="^(title|published_year|author_id)$"),
     skip: int = 0,
     limit: int = 10,
+    fields: tuple = Depends(book_fields),
     session: AsyncSession = Depends(get_async_session),
 ):
-    query = select(Book).options(joinedload(Book.author))
+    snapshot = catalog.fresh()
+    if snapshot is not None:
+        data = snapshot.query(title, genre, author_id, year_from, year_to, sort_by, skip, limit, fields)
+        if data is not None:
+            return Response(book_serializer(fields, many=True).dump_json(data), media_type="application/json")
+
+    query = columnar.books_query(fields)
 
     if title:
         query = query.where(Book.title.ilike(f"%{title}%"))
@@ -140,44 +209,33 @@ async def get_books(
     if year_to:
         query = query.where(Book.published_year <= year_to)
     if sort_by:
-        query = query.order_by(getattr(Book, sort_by))
+        # id breaks ties like the snapshot does, so pages are stable
+        query = query.order_by(getattr(Book, sort_by), Book.id)
 
     result = await session.execute(query.offset(skip).limit(limit))
-    books = result.scalars().all()
-    return [
-        BookOut(
-            id=b.id,
-            title=b.title,
-            genre=b.genre,
-            published_year=b.published_year,
-            author_id=b.author_id,
-            author_name=b.author.name
-        ) for b in books
-    ]
+    data = [row._asdict() for row in result]
+    return Response(book_serializer(fields, many=True).dump_json(data), media_type="application/json")
 
 
 # GET /books/{id}
 @router.get("/{book_id}", response_model=BookOut)
-async def get_book(book_id: int, session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(
-        select(Book).options(joinedload(Book.author)).where(Book.id == book_id)
-    )
-    book = result.scalars().first()
-    if not book:
+async def get_book(
+    book_id: int,
+    fields: tuple = Depends(book_fields),
+    session: AsyncSession = Depends(get_async_session),
+):
+    result = await session.execute(columnar.books_query(fields).where(Book.id == book_id))
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Book not found")
-    return BookOut(
-        id=book.id,
-        title=book.title,
-        genre=book.genre,
-        published_year=book.published_year,
-        author_id=book.author_id,
-        author_name=book.author.name
-    )
+    counters.view(book_id)
+    return Response(book_serializer(fields).dump_json(row._asdict()), media_type="application/json")
 
 # POST /books/
 @router.post("/", response_model=BookOut)
 async def create_book(
     data: BookCreate,
+    on_duplicate: str = Query("error", regex="^(skip|update|error)$"),
     session: AsyncSession = Depends(get_async_session),
     user=Depends(current_active_user)
 ):
@@ -185,12 +243,30 @@ async def create_book(
     if not author:
         raise HTTPException(status_code=400, detail="Author does not exist")
 
-    book = Book(**data.dict())
-    session.add(book)
+    fingerprint = book_fingerprint(data.title, data.author_id)
+    result = await session.scalars(
+        insert_books(on_duplicate)
+        .values(**data.model_dump(), fingerprint=fingerprint)
+        .returning(Book)
+    )
+    book = result.first()
+    # with "update" a returned row may be an existing book, the periodic reload fixes the count
+    created = book is not None and on_duplicate != "update"
+    if book is None:
+        if on_duplicate == "error":
+            raise HTTPException(status_code=409, detail="Book already exists")
+        query = select(Book).where(Book.fingerprint == fingerprint)
+        key = partition_key()
+        if key is not None:
+            # with partitioning the same fingerprint may exist once per partition
+            query = query.where(key == getattr(data, key.key))
+        result = await session.execute(query)
+        book = result.scalars().first()
     await session.commit()
-    await session.refresh(book)
+    if created:
+        autocomplete.count_books(book.author_id, 1)
 
-    return BookOut(
+    out = BookOut(
         id=book.id,
         title=book.title,
         genre=book.genre,
@@ -198,6 +274,8 @@ async def create_book(
         author_id=book.author_id,
         author_name=author.name
     )
+    catalog.upsert(out.model_dump())
+    return out
 
 # PUT /books/{book_id}
 @router.put("/{book_id}", response_model=BookOut)
@@ -219,13 +297,27 @@ async def update_book(
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
+    if "author_id" in update_data and not await session.get(Author, update_data["author_id"]):
+        raise HTTPException(status_code=400, detail="Author does not exist")
+
+    previous_author_id = book.author_id
     for field, value in update_data.items():
         setattr(book, field, value)
 
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        # 23505 unique_violation: the new title/author collides with another book's fingerprint
+        if getattr(exc.orig, "sqlstate", None) != "23505":
+            raise
+        raise HTTPException(status_code=409, detail="Book already exists")
     await session.refresh(book)
+    if book.author_id != previous_author_id:
+        autocomplete.count_books(previous_author_id, -1)
+        autocomplete.count_books(book.author_id, 1)
 
-    return BookOut(
+    out = BookOut(
         id=book.id,
         title=book.title,
         genre=book.genre,
@@ -233,6 +325,8 @@ async def update_book(
         author_id=book.author_id,
         author_name=book.author.name
     )
+    catalog.upsert(out.model_dump())
+    return out
 
 
 # DELETE /books/{id}
@@ -248,12 +342,37 @@ async def delete_book(
 
     await session.delete(book)
     await session.commit()
+    catalog.delete(book_id)
+    autocomplete.count_books(book.author_id, -1)
     return {"detail": f"Book {book_id} deleted successfully"}
 
+# DELETE /books/?author_id=&genre= — bulk delete in chunks
+@router.delete("/")
+async def delete_books(
+    author_id: Optional[int] = None,
+    genre: Optional[Genre] = None,
+    session: AsyncSession = Depends(get_async_session),
+    user=Depends(current_active_user)
+):
+    filters = []
+    if author_id:
+        filters.append(Book.author_id == author_id)
+    if genre:
+        filters.append(Book.genre == genre)
+    if not filters:
+        raise HTTPException(status_code=400, detail="At least one filter is required")
+
+    deleted = await delete_books_in_chunks(session, *filters)
+    if deleted:
+        catalog.invalidate()
+        autocomplete.invalidate()
+    return {"deleted_books": deleted}
+
 # POST /books/import
 @router.post("/import")
 async def import_books(
     file: UploadFile = File(...),
+    on_duplicate: str = Query("skip", regex="^(skip|update|error)$"),
     session: AsyncSession = Depends(get_async_session),
     user=Depends(current_active_user)
 ):
@@ -271,21 +390,50 @@ async def import_books(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid file format: {e}")
 
-    imported = 0
+    books = {}
+    parsed = 0
     for item in books_data:
         try:
-            book = Book(
+            values = dict(
                 title=item["title"].strip(),
                 genre=Genre(item["genre"]),
                 published_year=int(item["published_year"]),
                 author_id=int(item["author_id"])
             )
-            session.add(book)
-            imported += 1
         except Exception:
             continue
+        parsed += 1
+        fingerprint = book_fingerprint(values["title"], values["author_id"])
+        if on_duplicate == "update" or fingerprint not in books:
+            books[fingerprint] = dict(values, fingerprint=fingerprint)
+
+    if on_duplicate == "error":
+        if len(books) < parsed:
+            raise HTTPException(status_code=409, detail=f"File contains {parsed - len(books)} duplicate books")
+        # one round trip for the whole file instead of a lookup per book
+        existing = await session.execute(
+            select(Book.fingerprint).where(
+                Book.fingerprint == any_(bindparam("fingerprints", list(books), type_=ARRAY(String)))
+            )
+        )
+        duplicates = existing.scalars().all()
+        if duplicates:
+            raise HTTPException(status_code=409, detail=f"{len(duplicates)} books already exist")
+
+    rows = list(books.values())
+    imported = 0
+    for start in range(0, len(rows), settings.import_batch_size):
+        result = await session.execute(
+            insert_books(on_duplicate)
+            .values(rows[start:start + settings.import_batch_size])
+            .returning(Book.id)
+        )
+        imported += len(result.all())
 
     await session.commit()
-    return {"detail": f"Imported {imported} books"}
+    if imported:
+        catalog.invalidate()
+        autocomplete.invalidate()
+    return {"detail": f"Imported {imported} books", "imported": imported, "skipped": parsed - imported}
 
 
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.core.startup import state
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+# GET /health/live — the process is up and serving requests
+@router.get("/live")
+async def liveness():
+    return {"status": "ok"}
+
+# GET /health/ready — startup finished and the database answers
+@router.get("/ready")
+async def readiness():
+    if not state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception:
+        return JSONResponse(status_code=503, content={"status": "database unavailable"})
+
+    return {"status": "ok"}
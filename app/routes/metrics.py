@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.admission import route_classes
+
+router = APIRouter(tags=["health"])
+
+METRICS = [
+    ("admission_active", "gauge", "Requests holding a slot", lambda c: c.active),
+    ("admission_queue_depth", "gauge", "Requests waiting for a slot", lambda c: len(c.waiters)),
+    ("admission_admitted_total", "counter", "Requests admitted", lambda c: c.admitted),
+    ("admission_shed_total", "counter", "Requests rejected with 503", lambda c: c.shed),
+    ("admission_service_seconds", "gauge", "Average time a request holds a slot", lambda c: c.service_time),
+]
+
+# GET /metrics — admission control metrics of this worker, Prometheus text format
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    lines = []
+    for name, kind, help_text, value in METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for route_class in route_classes.values():
+            lines.append(f'{name}{{route_class="{route_class.name}"}} {value(route_class)}')
+    return "\n".join(lines) + "\n"
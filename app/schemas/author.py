@@ -21,3 +21,7 @@ class AuthorOut(AuthorBase):
 
     class Config:
         orm_mode = True
+
+
+class AuthorMatch(AuthorOut):
+    book_count: int
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field, validator
-from typing import Optional
+from pydantic import BaseModel, Field, TypeAdapter, validator
+from typing import List, Optional
+from typing_extensions import TypedDict
+from functools import lru_cache
 from enum import Enum
 import datetime
 
@@ -34,3 +36,19 @@ class BookOut(BookBase):
 
     class Config:
         orm_mode = True
+
+
+BOOK_FIELDS = ("id", "title", "genre", "published_year", "author_id", "author_name")
+
+
+@lru_cache(maxsize=None)
+def book_serializer(fields: tuple, many: bool = False) -> TypeAdapter:
+    """Serializer for rows that carry only ``fields``, built once per field set.
+
+    Rows come straight from the database, so they are dumped without validation.
+    """
+    row_type = TypedDict(
+        "BookFields",
+        {field: BookOut.model_fields[field].annotation for field in fields},
+    )
+    return TypeAdapter(List[row_type] if many else row_type)
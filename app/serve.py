@@ -0,0 +1,104 @@
+"""Production server entry point.
+
+    python -m app.serve
+
+Runs gunicorn with uvicorn workers: the app is imported once in the master
+and shared copy-on-write by the forked workers, and every worker is recycled
+after ``server_max_requests`` requests. Falls back to ``uvicorn --workers``,
+without worker recycling, when gunicorn is not installed (e.g. on Windows).
+"""
+import asyncio
+import importlib.util
+import os
+
+from app.core.config import settings
+
+
+def worker_count() -> int:
+    if settings.web_concurrency:
+        return settings.web_concurrency
+    if hasattr(os, "sched_getaffinity"):
+        return max(len(os.sched_getaffinity(0)), 1)
+    return os.cpu_count() or 1
+
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def uvicorn_options() -> dict:
+    return {
+        "loop": event_loop(),
+        "http": http_protocol(),
+        "limit_concurrency": settings.server_limit_concurrency,
+    }
+
+
+async def _check_schema():
+    from app.core.database import engine
+    from app.core.startup import check_schema_head
+
+    # runs in the master before fork; the workers find the cached result
+    await check_schema_head()
+    await engine.dispose()
+
+
+if importlib.util.find_spec("gunicorn"):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        CONFIG_KWARGS = uvicorn_options()
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{settings.server_host}:{settings.server_port}",
+                "workers": worker_count(),
+                "worker_class": "app.serve.Worker",
+                "preload_app": True,
+                "keepalive": settings.server_keepalive,
+                "backlog": settings.server_backlog,
+                "timeout": settings.server_timeout,
+                "max_requests": settings.server_max_requests,
+                "max_requests_jitter": settings.server_max_requests_jitter,
+                "loglevel": settings.log_level,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if settings.schema_check == "alembic":
+                asyncio.run(_check_schema())
+
+            from app.main import app
+            return app
+
+
+def main():
+    if importlib.util.find_spec("gunicorn"):
+        Application().run()
+        return
+
+    import uvicorn
+
+    # no limit_max_requests here: uvicorn's multiprocess supervisor does not
+    # replace workers that exit, so the server would stop after that many requests
+    uvicorn.run(
+        "app.main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=worker_count(),
+        timeout_keep_alive=settings.server_keepalive,
+        backlog=settings.server_backlog,
+        log_level=settings.log_level,
+        **uvicorn_options(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from app.main import app
-from app.core.database import Base, get_async_session
+from app.core.database import Base, engine, get_async_session
 from app.core.config import settings
 
 
@@ -26,6 +26,15 @@ async def setup_test_db():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest_asyncio.fixture(autouse=True)
+async def app_engine_pool():
+    # every test runs on a new event loop, and the app engine's pool may still hold
+    # connections from the previous one (streaming exports, background code)
+    await engine.dispose(close=False)
+    yield
+    await engine.dispose()
+
+
 @pytest_asyncio.fixture
 async def db_session() -> AsyncSession:
     async with TestSessionLocal() as session:
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import RouteClass, classify
+
+
+def test_classify_routes():
+    assert classify("GET", "/books/export").name == "heavy"
+    assert classify("DELETE", "/books/").name == "heavy"
+    assert classify("GET", "/books/42").name == "light"
+    assert classify("GET", "/health/ready") is None
+
+
+@pytest.mark.asyncio
+async def test_route_class_queues_then_sheds():
+    route_class = RouteClass("test", limit=1, queue_size=1, deadline=0.2)
+    assert await route_class.acquire() is None
+
+    queued = asyncio.create_task(route_class.acquire())
+    await asyncio.sleep(0)
+    assert len(route_class.waiters) == 1
+
+    # queue is full
+    assert await route_class.acquire() == 1
+    route_class.release()
+    assert await queued is None
+    assert route_class.active == 1
+
+    # the slot is not released before the deadline
+    assert await route_class.acquire() == 1
+    assert route_class.shed == 2
@@ -7,3 +7,9 @@ async def test_get_authors(client):
     response = await client.get("/authors/")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+
+@pytest.mark.asyncio
+async def test_autocomplete_authors(client):
+    response = await client.get("/authors/autocomplete?q=a&limit=5")
+    assert response.status_code == 200
+    assert len(response.json()) <= 5
@@ -0,0 +1,102 @@
+from app.core.autocomplete import AuthorIndex
+
+
+def make_index():
+    return AuthorIndex.build([
+        (1, "Gabriel García Márquez", 5),
+        (2, "Garth Nix", 12),
+        (3, "Ursula K. Le Guin", 7),
+        (4, "GARRY Kilworth", 0),
+    ])
+
+
+def names(matches):
+    return [match["name"] for match in matches]
+
+
+def test_search_folds_case_and_accents():
+    index = make_index()
+    assert names(index.search("garcia", 10)) == ["Gabriel García Márquez"]
+    assert names(index.search("MÁRQ", 10)) == ["Gabriel García Márquez"]
+
+
+def test_search_matches_any_word_ranked_by_book_count():
+    index = make_index()
+    assert names(index.search("gar", 10)) == ["Garth Nix", "Gabriel García Márquez", "GARRY Kilworth"]
+    assert names(index.search("le g", 10)) == ["Ursula K. Le Guin"]
+    assert names(index.search("ga", 2)) == ["Garth Nix", "Gabriel García Márquez"]
+
+
+def test_book_counts_change_the_ranking():
+    index = make_index()
+    index.count_books(4, 20)
+    assert names(index.search("ga", 1)) == ["GARRY Kilworth"]
+    index.count_books(4, -20)
+    assert names(index.search("ga", 1)) == ["Garth Nix"]
+
+
+def test_rename_and_remove():
+    index = make_index()
+    index.rename(2, "Neil Gaiman")
+    assert names(index.search("garth", 10)) == []
+    assert index.search("gai", 10) == [{"id": 2, "name": "Neil Gaiman", "book_count": 12}]
+
+    index.remove(1)
+    assert names(index.search("gar", 10)) == ["GARRY Kilworth"]
+    index.remove(1)
+    assert index.keys == sorted(index.keys)
+
+
+def test_full_top_list_is_recomputed_after_demotion():
+    index = AuthorIndex.build([(author_id, f"Author {author_id}", author_id) for author_id in range(60)])
+    assert [match["id"] for match in index.search("a", 3)] == [59, 58, 57]
+
+    index.count_books(59, -59)
+    assert [match["id"] for match in index.search("a", 3)] == [58, 57, 56]
+    assert [match["id"] for match in index.search("a", 50)][-1] == 9
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeDatabase:
+    """Stands in for async_session_maker; each execute returns the next row set after running its hook."""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        rows, during = self.steps.pop(0)
+        during()
+        return FakeResult(rows)
+
+
+async def test_reload_recounts_books_added_while_it_runs(monkeypatch):
+    from app.core import autocomplete as autocomplete_module
+    from app.core.autocomplete import AuthorAutocomplete
+
+    engine = AuthorAutocomplete()
+    # a book is created during the full load and another one during the recount
+    monkeypatch.setattr(autocomplete_module, "async_session_maker", FakeDatabase([
+        ([(1, "Octavia Butler", 5)], lambda: engine.count_books(1, 1)),
+        ([(1, "Octavia Butler", 6)], lambda: engine.count_books(1, 1)),
+        ([(1, "Octavia Butler", 7)], lambda: None),
+    ]))
+
+    await engine.reload()
+    assert engine.index.book_counts == {1: 7}
+    assert engine.journal is None
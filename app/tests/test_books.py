@@ -1,3 +1,5 @@
+import json
+
 import pytest
 
 @pytest.mark.asyncio
@@ -14,10 +16,215 @@ async def test_get_books_with_pagination(client):
     assert isinstance(data, list)
     assert len(data) <= 2
 
+@pytest.mark.asyncio
+async def test_get_all_books_sparse_fields(client):
+    response = await client.get("/books/all?fields=title,id")
+    assert response.status_code == 200
+    for book in response.json():
+        assert set(book) == {"id", "title"}
+
+    response = await client.get("/books/all?fields=id,isbn")
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_popular_books(client):
+    response = await client.get("/books/popular?genre=Science&limit=5")
+    assert response.status_code == 200
+    assert len(response.json()) <= 5
+
 @pytest.mark.asyncio
 async def test_export_books_json(client):
     response = await client.get("/books/export?format=json")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+@pytest.mark.asyncio
+async def test_export_books_arrow(client):
+    import pyarrow as pa
+
+    response = await client.get("/books/export?format=arrow")
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names[:2] == ["id", "title"]
+
+@pytest.mark.asyncio
+async def test_bulk_delete_books_requires_filter(client, authorized):
+    response = await client.delete("/books/")
+    assert response.status_code == 400
+
+@pytest.fixture
+def authorized():
+    from app.main import app
+    from app.routes.auth import current_active_user
+
+    app.dependency_overrides[current_active_user] = lambda: None
+
+
+async def create_author(client) -> int:
+    import uuid
+
+    response = await client.post("/authors/", json={"name": f"Author {uuid.uuid4().hex}"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+@pytest.mark.asyncio
+async def test_create_book_on_duplicate(client, authorized):
+    author_id = await create_author(client)
+    book = {"title": "Dune", "published_year": 1965, "genre": "Fiction", "author_id": author_id}
+
+    response = await client.post("/books/", json=book)
+    assert response.status_code == 200
+    book_id = response.json()["id"]
+
+    duplicate = dict(book, title="  dune ", published_year=1966)
+    response = await client.post("/books/", json=duplicate)
+    assert response.status_code == 409
+
+    response = await client.post("/books/?on_duplicate=skip", json=duplicate)
+    assert response.status_code == 200
+    assert response.json()["id"] == book_id
+    assert response.json()["published_year"] == 1965
+
+    response = await client.post("/books/?on_duplicate=update", json=duplicate)
+    assert response.status_code == 200
+    assert response.json()["id"] == book_id
+    assert response.json()["published_year"] == 1966
+
+@pytest.mark.asyncio
+async def test_import_books_on_duplicate(client, authorized):
+    author_id = await create_author(client)
+    books = [
+        {"title": "Cosmos", "published_year": 1980, "genre": "Science", "author_id": author_id},
+        {"title": "Contact", "published_year": 1985, "genre": "Fiction", "author_id": author_id},
+        {"title": "COSMOS", "published_year": 1981, "genre": "Science", "author_id": author_id},
+    ]
+
+    def upload(items):
+        return {"file": ("books.json", json.dumps(items), "application/json")}
+
+    # the first copy of an in-file duplicate wins with skip
+    response = await client.post("/books/import", files=upload(books))
+    assert response.json()["imported"] == 2
+    assert response.json()["skipped"] == 1
+
+    response = await client.post("/books/import?on_duplicate=skip", files=upload(books[:2]))
+    assert response.json()["imported"] == 0
+    assert response.json()["skipped"] == 2
+
+    response = await client.post("/books/import?on_duplicate=error", files=upload(books))
+    assert response.status_code == 409
+    response = await client.post("/books/import?on_duplicate=error", files=upload(books[:1]))
+    assert response.status_code == 409
 
+    # the last copy wins with update
+    response = await client.post("/books/import?on_duplicate=update", files=upload(books))
+    assert response.json()["imported"] == 2
+    response = await client.get(f"/books/?author_id={author_id}&title=cosmos")
+    assert [book["published_year"] for book in response.json()] == [1981]
+
+@pytest.mark.asyncio
+async def test_update_book_unknown_author(client, authorized):
+    author_id = await create_author(client)
+    book = {"title": "Solaris", "published_year": 1961, "genre": "Fiction", "author_id": author_id}
+    book_id = (await client.post("/books/", json=book)).json()["id"]
+
+    response = await client.put(f"/books/{book_id}", json={"author_id": 10**9})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_sparse_fields_author_name_only(client, authorized):
+    author_id = await create_author(client)
+    book = {"title": "Kindred", "published_year": 1979, "genre": "Fiction", "author_id": author_id}
+    book_id = (await client.post("/books/", json=book)).json()["id"]
+    author_name = (await client.get(f"/authors/{author_id}")).json()["name"]
+
+    response = await client.get(f"/books/{book_id}?fields=author_name")
+    assert response.status_code == 200
+    assert response.json() == {"author_name": author_name}
+
+    response = await client.get(f"/books/?author_id={author_id}&fields=author_name")
+    assert response.json() == [{"author_name": author_name}]
+
+    response = await client.get("/books/export?format=json&fields=author_name")
+    assert response.status_code == 200
+    assert {"author_name": author_name} in response.json()
+
+@pytest.mark.asyncio
+async def test_sparse_fields_must_not_be_empty(client):
+    for path in ("/books/all", "/books/", "/books/export"):
+        response = await client.get(f"{path}?fields=,")
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_export_books_parquet(client, authorized):
+    import io
+    import pyarrow.parquet as pq
+
+    author_id = await create_author(client)
+    book = {"title": "Ubik", "published_year": 1969, "genre": "Fiction", "author_id": author_id}
+    await client.post("/books/", json=book)
+    books = (await client.get("/books/all")).json()
+
+    response = await client.get("/books/export?format=parquet&fields=id,genre")
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names == ["id", "genre"]
+    assert table.num_rows == len(books)
+    exported = {row["id"]: row["genre"] for row in table.to_pylist()}
+    assert exported == {b["id"]: b["genre"] for b in books}
+
+@pytest.mark.asyncio
+async def test_book_stats(client, authorized):
+    from collections import Counter
+
+    author_id = await create_author(client)
+    for title, year, genre in [("Ice", 1967, "Fiction"), ("Nova", 1968, "Science"), ("Babel", 1975, "Science")]:
+        book = {"title": title, "published_year": year, "genre": genre, "author_id": author_id}
+        assert (await client.post("/books/", json=book)).status_code == 200
+    books = (await client.get("/books/all")).json()
+
+    response = await client.get("/books/stats?by=genre")
+    assert {row["genre"]: row["count"] for row in response.json()} == Counter(b["genre"] for b in books)
+
+    response = await client.get("/books/stats?by=decade")
+    expected = Counter(b["published_year"] // 10 * 10 for b in books)
+    assert {row["decade"]: row["count"] for row in response.json()} == expected
+
+    response = await client.get("/books/stats?by=author")
+    counts = response.json()
+    assert [row["count"] for row in counts] == sorted((row["count"] for row in counts), reverse=True)
+    assert [row["count"] for row in counts if row["author_id"] == author_id] == [3]
+
+
+@pytest.mark.asyncio
+async def test_bulk_deletes_in_chunks(client, authorized, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "bulk_delete_chunk_size", 2)
+
+    async def author_with_books(count: int) -> int:
+        author_id = await create_author(client)
+        for number in range(count):
+            book = {"title": f"Book {number}", "published_year": 2000, "genre": "History", "author_id": author_id}
+            assert (await client.post("/books/", json=book)).status_code == 200
+        return author_id
+
+    async def books_of(author_id: int) -> list:
+        return (await client.get(f"/books/?author_id={author_id}&limit=100")).json()
+
+    first, second, third, fourth = [await author_with_books(count) for count in (3, 2, 5, 2)]
+
+    response = await client.delete(f"/books/?author_id={third}")
+    assert response.json() == {"deleted_books": 5}
+    assert await books_of(third) == []
+
+    response = await client.delete(f"/authors/?ids={first}&ids={second}&ids={third}")
+    assert response.json() == {"deleted_authors": 3, "deleted_books": 5}
+    for author_id in (first, second, third):
+        assert await books_of(author_id) == []
+        assert (await client.get(f"/authors/{author_id}")).status_code == 404
+
+    # a single author delete leaves its books to the ON DELETE CASCADE foreign key
+    response = await client.delete(f"/authors/{fourth}")
+    assert response.status_code == 200
+    assert await books_of(fourth) == []
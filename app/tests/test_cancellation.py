@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cancellation import CancelOnDisconnectMiddleware, StatementTimeoutMiddleware
+from app.core.config import settings
+from app.core.database import engine, get_async_session
+from app.main import statement_timeout_handler
+
+slow_app = FastAPI()
+slow_app.add_middleware(CancelOnDisconnectMiddleware)
+
+
+@slow_app.get("/slow")
+async def slow(session: AsyncSession = Depends(get_async_session)):
+    await session.execute(text("SELECT pg_sleep(30)"))
+    return {}
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_frees_connection():
+    checked_out = []
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.5)
+        checked_out.append(engine.pool.checkedout())
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/slow", "raw_path": b"/slow",
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+
+    start = time.monotonic()
+    await asyncio.wait_for(slow_app(scope, receive, send), timeout=10)
+
+    assert time.monotonic() - start < 5
+    assert checked_out == [1]
+    assert engine.pool.checkedout() == 0
+
+
+timeout_app = FastAPI()
+timeout_app.add_middleware(StatementTimeoutMiddleware)
+timeout_app.add_exception_handler(DBAPIError, statement_timeout_handler)
+
+
+@timeout_app.get("/sleep")
+async def sleep(session: AsyncSession = Depends(get_async_session)):
+    await session.execute(text("SELECT pg_sleep(5)"))
+    return {}
+
+
+@pytest.mark.asyncio
+async def test_statement_timeout_returns_504(monkeypatch):
+    monkeypatch.setattr(settings, "statement_timeouts", {"/sleep": 100})
+
+    start = time.monotonic()
+    async with AsyncClient(app=timeout_app, base_url="http://test") as client:
+        response = await client.get("/sleep")
+
+    assert response.status_code == 504
+    assert time.monotonic() - start < 3
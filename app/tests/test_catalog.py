@@ -0,0 +1,55 @@
+import asyncio
+
+from app.core import catalog as catalog_module
+from app.core.catalog import CatalogEngine
+from app.tests.test_snapshot import make_snapshot
+
+
+async def test_invalidate_keeps_snapshot_stale_until_reloaded(monkeypatch):
+    loaded = asyncio.Event()
+    release = asyncio.Event()
+
+    async def load_snapshot():
+        loaded.set()
+        await release.wait()
+        return make_snapshot()
+
+    monkeypatch.setattr(catalog_module, "load_snapshot", load_snapshot)
+    engine = CatalogEngine()
+    release.set()
+    await engine.reload()
+    old = engine.fresh()
+    assert old is not None
+
+    engine.invalidate()
+    release.clear()
+    loaded.clear()
+    reload = asyncio.create_task(engine.reload())
+    await loaded.wait()
+    assert engine.fresh() is None
+
+    release.set()
+    await reload
+    assert engine.fresh() is not None
+    assert engine.fresh() is not old
+
+
+async def test_invalidate_during_reload_stays_stale(monkeypatch):
+    loaded = asyncio.Event()
+    release = asyncio.Event()
+
+    async def load_snapshot():
+        loaded.set()
+        await release.wait()
+        return make_snapshot()
+
+    monkeypatch.setattr(catalog_module, "load_snapshot", load_snapshot)
+    engine = CatalogEngine()
+    reload = asyncio.create_task(engine.reload())
+    await loaded.wait()
+    engine.invalidate()
+    release.set()
+    await reload
+
+    assert engine.snapshot is not None
+    assert engine.fresh() is None
@@ -0,0 +1,51 @@
+import pytest
+
+@pytest.mark.asyncio
+async def test_liveness(client):
+    response = await client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+@pytest.mark.asyncio
+async def test_readiness_after_startup(client, monkeypatch):
+    from app.core import startup
+
+    monkeypatch.setattr(startup.settings, "schema_check", "off")
+    monkeypatch.setattr(startup.state, "ready", False)
+    seen_ready = []
+
+    async def fill_cache():
+        seen_ready.append(startup.state.ready)
+
+    monkeypatch.setattr(startup, "warmup_hooks", [fill_cache])
+
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+
+    await startup.startup()
+    assert seen_ready == [False]
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+    await startup.shutdown()
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+
+@pytest.mark.asyncio
+async def test_schema_check_rejects_other_revision(monkeypatch, tmp_path):
+    from sqlalchemy import text
+    from app.core import startup
+
+    monkeypatch.setattr(startup, "alembic_head", lambda: "0123456789ab")
+    monkeypatch.setattr(startup.tempfile, "gettempdir", lambda: str(tmp_path))
+    async with startup.engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        await conn.execute(text("INSERT INTO alembic_version VALUES ('ba9876543210')"))
+    try:
+        with pytest.raises(RuntimeError, match="ba9876543210, expected 0123456789ab"):
+            await startup.check_schema_head()
+        assert not list(tmp_path.iterdir())
+    finally:
+        async with startup.engine.begin() as conn:
+            await conn.execute(text("DROP TABLE alembic_version"))
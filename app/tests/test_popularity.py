@@ -0,0 +1,127 @@
+import asyncio
+
+from app.core import popularity
+from app.core.config import settings
+from app.core.popularity import BookCounters, PopularBooks
+from app.models.book import Genre
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeDatabase:
+    """Stands in for async_session_maker, recording the parameters of every execute."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.executed = []
+        self.failing = False
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement, params=None):
+        if self.failing:
+            raise ConnectionError("database is down")
+        self.executed.append(params)
+        return FakeResult(self.rows)
+
+    async def commit(self):
+        pass
+
+
+def use_database(monkeypatch, rows=()):
+    database = FakeDatabase(rows)
+    monkeypatch.setattr(popularity, "async_session_maker", database)
+    return database
+
+
+async def test_flush_writes_one_sorted_batch(monkeypatch):
+    database = use_database(monkeypatch)
+    counters = BookCounters()
+    counters.view(7)
+    counters.view(3)
+    counters.view(7)
+    counters.impression([3, 5])
+
+    await counters.flush()
+    assert database.executed == [[
+        {"book_id": 3, "views": 1, "impressions": 1},
+        {"book_id": 5, "views": 0, "impressions": 1},
+        {"book_id": 7, "views": 2, "impressions": 0},
+    ]]
+    assert counters.events == 0
+
+    await counters.flush()
+    assert len(database.executed) == 1
+
+
+async def test_failed_flush_keeps_counts(monkeypatch):
+    database = use_database(monkeypatch)
+    counters = BookCounters()
+    counters.view(1)
+    counters.impression([1])
+
+    database.failing = True
+    await counters.flush()
+    assert counters.events == 2
+
+    counters.view(1)
+    database.failing = False
+    await counters.flush()
+    assert database.executed == [[{"book_id": 1, "views": 2, "impressions": 1}]]
+
+
+async def test_enough_events_wake_the_flush(monkeypatch):
+    database = use_database(monkeypatch)
+    monkeypatch.setattr(settings, "counter_flush_events", 3)
+    monkeypatch.setattr(settings, "counter_flush_seconds", 60)
+    counters = BookCounters()
+    task = asyncio.create_task(counters.run())
+
+    counters.impression([1, 2, 3])
+    await asyncio.sleep(0.05)
+    assert len(database.executed) == 1
+
+    counters.view(4)
+    await counters.stop(task)
+    assert database.executed[-1] == [{"book_id": 4, "views": 1, "impressions": 0}]
+    assert counters.events == 0
+
+
+async def test_refresh_ranks_overall_and_per_genre(monkeypatch):
+    monkeypatch.setattr(settings, "popularity_top_n", 2)
+
+    def row(book_id, genre, views):
+        return {
+            "id": book_id, "title": f"Book {book_id}", "genre": genre, "published_year": 2000,
+            "author_id": 1, "author_name": "Author", "views": views, "rank": 1,
+        }
+
+    # rows come back ordered by views
+    use_database(monkeypatch, [
+        row(1, Genre.science, 30), row(2, Genre.fiction, 20), row(3, Genre.science, 10),
+    ])
+    popular = PopularBooks()
+    await popular.refresh()
+
+    assert [book["id"] for book in popular.books()] == [1, 2]
+    assert [book["id"] for book in popular.books(Genre.science)] == [1, 3]
+    assert [book["id"] for book in popular.books(Genre.science, limit=1)] == [1]
+    assert popular.books(Genre.history) == []
+    assert popular.score(3) == 10
+    assert popular.score(42) == 0
@@ -0,0 +1,58 @@
+from app.core.snapshot import Snapshot
+from app.models.book import Genre
+
+FIELDS = ("id", "title", "author_name")
+
+
+def make_snapshot():
+    snapshot = Snapshot(
+        ids=[1, 2, 3],
+        years=[1990, 2005, 1995],
+        author_ids=[1, 2, 1],
+        genres=[0, 2, 0],
+        titles=["Dune", "Cosmos", "Dune Messiah"],
+        author_names={1: "Frank Herbert", 2: "Carl Sagan"},
+    )
+    snapshot.set_title_order([2, 1, 3])
+    snapshot.install_indexes(*snapshot.build_indexes())
+    return snapshot
+
+
+def test_snapshot_filters_and_sorting():
+    snapshot = make_snapshot()
+    books = snapshot.query(title="dune", year_from=1991, fields=FIELDS)
+    assert books == [{"id": 3, "title": "Dune Messiah", "author_name": "Frank Herbert"}]
+
+    books = snapshot.query(sort_by="title", fields=("id",))
+    assert [b["id"] for b in books] == [2, 1, 3]
+
+
+def test_snapshot_mutations():
+    snapshot = make_snapshot()
+    snapshot.delete(1)
+    snapshot.upsert({
+        "id": 4, "title": "Contact", "genre": Genre.fiction,
+        "published_year": 1985, "author_id": 2, "author_name": "Carl Sagan",
+    })
+    books = snapshot.query(genre=Genre.fiction, sort_by="published_year", fields=("id",))
+    assert [b["id"] for b in books] == [4, 3]
+
+
+def test_snapshot_sorts_titles_in_database_order():
+    snapshot = make_snapshot()
+    # a collation where "Dune" sorts before "Cosmos" is as good as any for the snapshot
+    snapshot.set_title_order([1, 3, 2])
+    books = snapshot.query(sort_by="title", fields=("id",))
+    assert [b["id"] for b in books] == [1, 3, 2]
+
+    # ids that are not exactly the snapshot's books are ignored
+    snapshot.set_title_order([1, 2])
+    assert [b["id"] for b in snapshot.query(sort_by="title", fields=("id",))] == [1, 3, 2]
+
+    # a changed title cannot be placed without the collation, so the database has to sort
+    snapshot.upsert({
+        "id": 2, "title": "Contact", "genre": Genre.science,
+        "published_year": 1985, "author_id": 2, "author_name": "Carl Sagan",
+    })
+    assert snapshot.query(sort_by="title", fields=("id",)) is None
+    assert snapshot.query(sort_by="published_year", fields=("id",)) is not None
@@ -0,0 +1,88 @@
+"""Check partition pruning of the get_books filters and time pruned vs. full scans.
+
+Needs a database converted with ``scripts/partition_books.py``. Every query is run
+with ``enable_partition_pruning`` on and off; the plan shows how many
+partitions were scanned.
+
+    python -m benchmarks.bench_partitions
+"""
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.core import columnar
+from app.core.database import engine
+from app.core.partitions import read_partitioning
+from app.models.book import Book, Genre
+
+RUNS = 5
+
+FILTERS = {
+    "published_year": {
+        "year_from=1990&year_to=1999": [Book.published_year >= 1990, Book.published_year <= 1999],
+        "year_from=2020": [Book.published_year >= 2020],
+    },
+    "genre": {
+        "genre=Science": [Book.genre == Genre.science],
+        "genre=History&year_from=1900": [Book.genre == Genre.history, Book.published_year >= 1900],
+    },
+}
+
+
+def compile_query(filters) -> str:
+    query = columnar.books_query(("id", "title")).where(*filters)
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def scanned_partitions(plan) -> set:
+    found = set()
+    if plan.get("Relation Name", "").startswith("books"):
+        found.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found |= scanned_partitions(child)
+    return found
+
+
+async def measure(conn, sql: str, pruning: bool):
+    await conn.execute(text(f"SET enable_partition_pruning = {'on' if pruning else 'off'}"))
+    result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await conn.execute(text(sql))
+        timings.append((time.perf_counter() - start) * 1000)
+    return scanned_partitions(plan[0]["Plan"]), statistics.median(timings)
+
+
+async def main():
+    async with engine.connect() as conn:
+        partition_by = await read_partitioning(conn)
+        if not partition_by:
+            raise SystemExit("books is not partitioned, see scripts/partition_books.py")
+
+        result = await conn.execute(
+            text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'books'::regclass")
+        )
+        total = result.scalar()
+        print(f"books is partitioned by {partition_by} into {total} partitions\n")
+
+        for name, filters in FILTERS[partition_by].items():
+            sql = compile_query(filters)
+            pruned, pruned_ms = await measure(conn, sql, pruning=True)
+            full, full_ms = await measure(conn, sql, pruning=False)
+            status = "pruned" if len(pruned) < len(full) else "NOT PRUNED"
+            print(f"{name:32} {status:10} {len(pruned):3}/{len(full):3} partitions  "
+                  f"{pruned_ms:8.1f} ms vs {full_ms:8.1f} ms")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
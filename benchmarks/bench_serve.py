@@ -0,0 +1,74 @@
+"""Compare ``python -m app.serve`` with a default single-process uvicorn.
+
+Starts each server in turn, waits for ``/health/live`` and fires REQUESTS
+requests with CONCURRENCY in flight against PATH.
+
+    python -m benchmarks.bench_serve [path]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+REQUESTS = 5000
+CONCURRENCY = 64
+PORT = 8765
+
+SERVERS = {
+    "uvicorn (1 process)": [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT)],
+    "app.serve": [sys.executable, "-m", "app.serve"],
+}
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health/live")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def hammer(path: str) -> tuple[float, list[float]]:
+    limits = httpx.Limits(max_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits) as client:
+        await wait_ready(client)
+        latencies = []
+        queue = iter(range(REQUESTS))
+
+        async def worker():
+            for _ in queue:
+                start = time.perf_counter()
+                await client.get(path)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "/health/live"
+    env = {**os.environ, "SERVER_PORT": str(PORT), "LOG_LEVEL": "warning"}
+
+    for name, command in SERVERS.items():
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            elapsed, latencies = asyncio.run(hammer(path))
+        finally:
+            process.terminate()
+            process.wait()
+
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"{name:22} {REQUESTS / elapsed:9.0f} req/s  p50 {p50:6.1f} ms  p99 {p99:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
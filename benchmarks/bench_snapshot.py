@@ -0,0 +1,111 @@
+"""Memory and latency of the in-memory catalog snapshot vs. the SQL path.
+
+Builds a synthetic snapshot of BOOKS books, reports its memory per million
+books and the median latency of typical GET /books/ filters. With
+``--sql`` the same filters are also run against the database the app is
+configured with.
+
+    python -m benchmarks.bench_snapshot [--sql]
+"""
+import asyncio
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+
+from app.core import columnar
+from app.core.snapshot import Snapshot, GENRES
+from app.models.book import Book, Genre
+from app.schemas.book import BOOK_FIELDS
+
+BOOKS = 1_000_000
+AUTHORS = 50_000
+RUNS = 50
+
+QUERIES = {
+    "genre + year range": dict(genre=Genre.science, year_from=1990, year_to=1999),
+    "author_id": dict(author_id=42),
+    "title contains": dict(title="qzx"),
+    "genre, sort by title": dict(genre=Genre.history, sort_by="title"),
+    "no filter, skip 500000": dict(skip=500_000),
+}
+
+
+def synthetic_snapshot() -> Snapshot:
+    random.seed(0)
+    words = ["".join(random.choices(string.ascii_lowercase, k=random.randint(3, 8))) for _ in range(20_000)]
+    titles = [" ".join(random.choices(words, k=3)).title() for _ in range(BOOKS)]
+    snapshot = Snapshot(
+        ids=range(1, BOOKS + 1),
+        years=[random.randint(1800, 2025) for _ in range(BOOKS)],
+        author_ids=[random.randint(1, AUTHORS) for _ in range(BOOKS)],
+        genres=[random.randrange(len(GENRES)) for _ in range(BOOKS)],
+        titles=titles,
+        author_names={author_id: f"Author {author_id}" for author_id in range(1, AUTHORS + 1)},
+    )
+    # stands in for the ORDER BY title the catalog loads from the database
+    snapshot.set_title_order(sorted(range(1, BOOKS + 1), key=lambda book_id: titles[book_id - 1]))
+    snapshot.install_indexes(*snapshot.build_indexes())
+    return snapshot
+
+
+def median_ms(call) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def sql_median_ms(filters: dict) -> float:
+    from app.core.database import async_session_maker
+
+    query = columnar.books_query(BOOK_FIELDS)
+    if "title" in filters:
+        query = query.where(Book.title.ilike(f"%{filters['title']}%"))
+    if "genre" in filters:
+        query = query.where(Book.genre == filters["genre"])
+    if "author_id" in filters:
+        query = query.where(Book.author_id == filters["author_id"])
+    if "year_from" in filters:
+        query = query.where(Book.published_year >= filters["year_from"])
+    if "year_to" in filters:
+        query = query.where(Book.published_year <= filters["year_to"])
+    if "sort_by" in filters:
+        query = query.order_by(getattr(Book, filters["sort_by"]), Book.id)
+    query = query.offset(filters.get("skip", 0)).limit(10)
+
+    timings = []
+    async with async_session_maker() as session:
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            await session.execute(query)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    tracemalloc.start()
+    snapshot = synthetic_snapshot()
+    tracemalloc.stop()
+    # everything but the snapshot (title lists, random numbers) has been freed again
+    tracemalloc.start()
+    snapshot = synthetic_snapshot()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"snapshot of {BOOKS:,} books: {memory / 1e6:.0f} MB "
+          f"({memory / 1e6 * 1_000_000 / BOOKS:.0f} MB per million books)\n")
+
+    for name, filters in QUERIES.items():
+        snapshot_ms = median_ms(lambda: snapshot.query(fields=BOOK_FIELDS, **filters))
+        line = f"{name:26} snapshot {snapshot_ms:8.3f} ms"
+        if "--sql" in sys.argv:
+            line += f"   sql {asyncio.run(sql_median_ms(filters)):8.3f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
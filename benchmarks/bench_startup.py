@@ -0,0 +1,55 @@
+"""Measure worker startup time.
+
+Runs the import of ``app.main`` in a fresh interpreter and then the lifespan
+startup with a cold (no marker) and a cached schema check. Needs a migrated
+database reachable through ``DATABASE_URL``.
+
+    python -m benchmarks.bench_startup
+"""
+import asyncio
+import subprocess
+import sys
+import time
+
+TARGET_MS = 250
+RUNS = 5
+
+
+def measure_import() -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+async def measure_lifespan(cold: bool) -> float:
+    from app.core.startup import alembic_head, _marker_path, startup, shutdown
+
+    if cold:
+        _marker_path(alembic_head()).unlink(missing_ok=True)
+
+    start = time.perf_counter()
+    await startup()
+    elapsed = (time.perf_counter() - start) * 1000
+    await shutdown()
+    return elapsed
+
+
+async def main():
+    imports = sorted(measure_import() for _ in range(RUNS))
+    cold = [await measure_lifespan(cold=True) for _ in range(RUNS)]
+    warm = [await measure_lifespan(cold=False) for _ in range(RUNS)]
+
+    import_ms = imports[RUNS // 2]
+    cold_ms = sorted(cold)[RUNS // 2]
+    warm_ms = sorted(warm)[RUNS // 2]
+    total_ms = import_ms + warm_ms
+
+    print(f"import app.main:        {import_ms:8.1f} ms")
+    print(f"startup, cold check:    {cold_ms:8.1f} ms")
+    print(f"startup, cached check:  {warm_ms:8.1f} ms")
+    print(f"worker start (cached):  {total_ms:8.1f} ms  target {TARGET_MS} ms  "
+          f"{'OK' if total_ms <= TARGET_MS else 'OVER'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""Convert the books table to a partitioned table, or back.
+
+Partitioning is kept out of the alembic revisions on purpose: every revision
+id means one schema, and this is a choice per deployment. Run it on a database
+at the alembic head:
+
+    python scripts/partition_books.py --by published_year --span 10
+    python scripts/partition_books.py --by genre
+    python scripts/partition_books.py --undo
+
+The DDL is frozen here, like the data migrations. Workers read the layout from
+the database on startup (app/core/partitions.py) and add partitions for new
+year ranges themselves.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.config import settings
+
+FIRST_YEAR = 1800
+GENRES = ("fiction", "nonfiction", "science", "history")
+COLUMNS = "id, title, published_year, genre, author_id, fingerprint"
+STRATEGIES = {"published_year": "PARTITION BY RANGE (published_year)", "genre": "PARTITION BY LIST (genre)"}
+
+
+def is_partitioned(conn) -> bool:
+    result = conn.execute(sa.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'books'::regclass"))
+    return result.first() is not None
+
+
+def rename_old_table(conn, suffix: str) -> None:
+    conn.execute(sa.text(f"ALTER TABLE books RENAME TO books_{suffix}"))
+    conn.execute(sa.text(f"ALTER TABLE books_{suffix} RENAME CONSTRAINT books_pkey TO books_{suffix}_pkey"))
+    conn.execute(sa.text(f"ALTER TABLE books_{suffix} RENAME CONSTRAINT books_author_id_fkey TO books_{suffix}_author_id_fkey"))
+    conn.execute(sa.text(f"ALTER INDEX ix_books_id RENAME TO ix_books_{suffix}_id"))
+    conn.execute(sa.text(f"ALTER INDEX ix_books_fingerprint RENAME TO ix_books_{suffix}_fingerprint"))
+
+
+def create_books(conn, partition_by: str = "") -> None:
+    key = f", {partition_by}" if partition_by else ""
+    strategy = f" {STRATEGIES[partition_by]}" if partition_by else ""
+    conn.execute(sa.text(
+        "CREATE TABLE books ("
+        " id INTEGER NOT NULL DEFAULT nextval('books_id_seq'),"
+        " title VARCHAR NOT NULL,"
+        " published_year INTEGER NOT NULL,"
+        " genre genre NOT NULL,"
+        " author_id INTEGER NOT NULL,"
+        " fingerprint VARCHAR NOT NULL,"
+        f" CONSTRAINT books_pkey PRIMARY KEY (id{key}),"
+        " CONSTRAINT books_author_id_fkey FOREIGN KEY (author_id) REFERENCES authors (id) ON DELETE CASCADE"
+        f"){strategy}"
+    ))
+    conn.execute(sa.text("ALTER SEQUENCE books_id_seq OWNED BY books.id"))
+    conn.execute(sa.text("CREATE INDEX ix_books_id ON books (id)"))
+    conn.execute(sa.text(f"CREATE UNIQUE INDEX ix_books_fingerprint ON books (fingerprint{key})"))
+
+
+def create_partitions(conn, partition_by: str, span: int) -> None:
+    if partition_by == "published_year":
+        until_year = datetime.date.today().year + span
+        for start in range(FIRST_YEAR, until_year + 1, span):
+            conn.execute(sa.text(
+                f"CREATE TABLE books_y{start} PARTITION OF books FOR VALUES FROM ({start}) TO ({start + span})"
+            ))
+    else:
+        for genre in GENRES:
+            conn.execute(sa.text(f"CREATE TABLE books_{genre} PARTITION OF books FOR VALUES IN ('{genre}')"))
+    conn.execute(sa.text("CREATE TABLE books_default PARTITION OF books DEFAULT"))
+
+
+def move_rows(conn, suffix: str) -> None:
+    conn.execute(sa.text(f"INSERT INTO books ({COLUMNS}) SELECT {COLUMNS} FROM books_{suffix}"))
+    conn.execute(sa.text(f"DROP TABLE books_{suffix}"))
+    conn.execute(sa.text("ANALYZE books"))
+
+
+def partition(conn, partition_by: str, span: int) -> None:
+    if is_partitioned(conn):
+        raise SystemExit("books is already partitioned, run with --undo first")
+    rename_old_table(conn, "unpartitioned")
+    create_books(conn, partition_by)
+    create_partitions(conn, partition_by, span)
+    move_rows(conn, "unpartitioned")
+
+
+def unpartition(conn) -> None:
+    if not is_partitioned(conn):
+        raise SystemExit("books is not partitioned")
+    rename_old_table(conn, "partitioned")
+    create_books(conn)
+    # partitions only enforced unique fingerprints per partition key
+    conn.execute(sa.text(
+        "DELETE FROM books_partitioned AS dup USING books_partitioned AS kept "
+        "WHERE dup.fingerprint = kept.fingerprint AND dup.id > kept.id"
+    ))
+    move_rows(conn, "partitioned")
+
+
+async def main(args) -> None:
+    engine = create_async_engine(settings.database_url)
+    async with engine.begin() as conn:
+        if args.undo:
+            await conn.run_sync(unpartition)
+        else:
+            await conn.run_sync(partition, args.by, args.span)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--by", choices=sorted(STRATEGIES))
+    group.add_argument("--undo", action="store_true")
+    parser.add_argument("--span", type=int, default=10, help="years per range partition")
+    asyncio.run(main(parser.parse_args()))